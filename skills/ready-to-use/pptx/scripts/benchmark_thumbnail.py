@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+"""
+Benchmark the thumbnail.py pipeline stage by stage on synthetic decks.
+
+Generates decks locally with python-pptx (mixed layouts, text-heavy slides and
+hidden slides), then runs each thumbnail.py stage separately and records:
+- Wall time per stage
+- Peak RSS of the stage's Python worker and of its child processes
+  (soffice, pdftoppm)
+- Peak temp-disk usage during each stage, plus the peak for the whole run
+
+Stages:
+- load: Presentation parsing and hidden-slide detection
+- soffice: PPTX to PDF conversion
+- pdftoppm: PDF to JPEG rasterization
+- placeholders: JPEG round-trip to create hidden-slide placeholders
+- grids: create_grids compositing and final JPEG encoding
+
+Each deck runs the pipeline --warmup times unmeasured, then --repeat times;
+every metric stores the median of the measured runs.
+
+Every stage runs in a fresh worker process, so its RSS peaks (ru_maxrss for
+the worker and RUSAGE_CHILDREN for its children) belong to that stage alone.
+The worker's peak includes the interpreter and imports, a constant baseline.
+
+Temp disk covers the run's work directory, which is also the worker's TMPDIR
+(inherited by soffice and pdftoppm), and the soffice user profile, which is
+kept per deck so warm-up runs initialise it. A background thread samples the
+size every DISK_SAMPLE_INTERVAL seconds, so files that live for less than one
+interval can still be missed.
+
+Usage:
+    python benchmark_thumbnail.py [--sizes 10,100,500] [--output results.json]
+                                  [--repeat 3] [--warmup 1]
+                                  [--compare baseline.json] [--threshold 0.15]
+                                  [--memory-threshold 0.10] [--disk-threshold 0.10]
+                                  [--min-seconds 0.05]
+
+Examples:
+    python benchmark_thumbnail.py --output baseline.json
+    # Benchmarks 10, 100 and 500 slide decks, writes baseline.json
+
+    python benchmark_thumbnail.py --output current.json --compare baseline.json
+    # Prints per-stage time, RSS and temp-disk deltas against the baseline and
+    # exits with status 1 if any metric grows past its relative threshold and
+    # an absolute floor (--min-seconds, 5 MB), a stage errors, or a baseline
+    # stage is missing from the current run
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import resource
+import shutil
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+
+from pptx import Presentation
+from pptx.util import Inches, Pt
+
+import thumbnail
+
+DEFAULT_SIZES = [10, 100, 500]
+DEFAULT_THRESHOLD = 0.15  # Relative slowdown that counts as a regression
+DEFAULT_MEMORY_THRESHOLD = 0.10  # Relative RSS growth that counts as a regression
+DEFAULT_DISK_THRESHOLD = 0.10  # Relative temp-disk growth that counts as a regression
+DEFAULT_REPEAT = 3  # Measured pipeline runs per deck (median is stored)
+DEFAULT_WARMUP = 1  # Unmeasured pipeline runs per deck
+DEFAULT_MIN_SECONDS = 0.05  # Smallest slowdown that can count as a regression
+MIN_MB = 5.0  # Smallest RSS or temp-disk growth that can count as a regression
+DISK_SAMPLE_INTERVAL = 0.05  # Seconds between temp-disk samples during a stage
+HIDDEN_EVERY = 7  # Every Nth slide is hidden
+TEXT_HEAVY_BULLETS = 12  # Bullet paragraphs on text-heavy slides
+
+# Compared stage metrics and their units
+METRICS = {
+    "seconds": "s",
+    "peak_rss_mb": "MB",
+    "children_peak_rss_mb": "MB",
+    "temp_disk_mb": "MB",
+}
+
+LOREM = (
+    "Quarterly revenue grew across all regions while operating costs held flat, "
+    "driven by improved retention and a shorter sales cycle in enterprise accounts"
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark thumbnail.py stages on synthetic decks."
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(n) for n in DEFAULT_SIZES),
+        help="Comma-separated slide counts (default: 10,100,500)",
+    )
+    parser.add_argument(
+        "--output",
+        default="thumbnail-benchmark.json",
+        help="Results JSON file (default: thumbnail-benchmark.json)",
+    )
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Relative slowdown flagged as a regression (default: {DEFAULT_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--memory-threshold",
+        type=float,
+        default=DEFAULT_MEMORY_THRESHOLD,
+        help="Relative RSS growth flagged as a regression "
+        f"(default: {DEFAULT_MEMORY_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--disk-threshold",
+        type=float,
+        default=DEFAULT_DISK_THRESHOLD,
+        help="Relative temp-disk growth flagged as a regression "
+        f"(default: {DEFAULT_DISK_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=DEFAULT_MIN_SECONDS,
+        help="Smallest absolute slowdown flagged as a regression "
+        f"(default: {DEFAULT_MIN_SECONDS})",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help="Measured runs per deck; the median is stored "
+        f"(default: {DEFAULT_REPEAT})",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=DEFAULT_WARMUP,
+        help=f"Unmeasured warm-up runs per deck (default: {DEFAULT_WARMUP})",
+    )
+    parser.add_argument(
+        "--cols",
+        type=int,
+        default=thumbnail.DEFAULT_COLS,
+        help=f"Grid columns passed to create_grids (default: {thumbnail.DEFAULT_COLS})",
+    )
+    args = parser.parse_args()
+    if args.repeat < 1 or args.warmup < 0:
+        parser.error("--repeat must be at least 1 and --warmup at least 0")
+
+    sizes = [int(x) for x in args.sizes.split(",")]
+
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "dpi": thumbnail.CONVERSION_DPI,
+        "cols": args.cols,
+        "repeat": args.repeat,
+        "warmup": args.warmup,
+        "decks": {},
+    }
+
+    for num_slides in sizes:
+        print(f"Benchmarking {num_slides}-slide deck...")
+        deck = benchmark_deck(num_slides, args.cols, args.repeat, args.warmup)
+        results["decks"][str(num_slides)] = deck
+        print_deck(num_slides, deck)
+
+    output_path = Path(args.output)
+    output_path.write_text(json.dumps(results, indent=2))
+    print(f"Saved results to {output_path}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        # (relative threshold, minimum absolute delta) per metric
+        thresholds = {
+            "seconds": (args.threshold, args.min_seconds),
+            "peak_rss_mb": (args.memory_threshold, MIN_MB),
+            "children_peak_rss_mb": (args.memory_threshold, MIN_MB),
+            "temp_disk_mb": (args.disk_threshold, MIN_MB),
+        }
+        regressions = compare_results(baseline, results, thresholds)
+        if regressions:
+            print(f"Found {len(regressions)} regression(s)")
+            sys.exit(1)
+
+
+def create_synthetic_deck(path, num_slides):
+    """Create a deck cycling through title, text-heavy and mixed layouts."""
+    prs = Presentation()
+    title_layout = prs.slide_layouts[0]
+    content_layout = prs.slide_layouts[1]
+    blank_layout = prs.slide_layouts[6]
+
+    for i in range(num_slides):
+        kind = i % 3
+        if kind == 0:
+            slide = prs.slides.add_slide(title_layout)
+            slide.shapes.title.text = f"Section {i // 3 + 1}"
+            slide.placeholders[1].text = "Synthetic benchmark deck"
+        elif kind == 1:
+            # Text-heavy: many bullets in the body placeholder
+            slide = prs.slides.add_slide(content_layout)
+            slide.shapes.title.text = f"Findings {i}"
+            body = slide.placeholders[1].text_frame
+            body.text = LOREM
+            for level in range(1, TEXT_HEAVY_BULLETS):
+                para = body.add_paragraph()
+                para.text = LOREM
+                para.level = level % 3
+        else:
+            # Mixed: several free-floating text boxes
+            slide = prs.slides.add_slide(blank_layout)
+            for row in range(3):
+                for col in range(2):
+                    box = slide.shapes.add_textbox(
+                        Inches(0.5 + col * 4.5),
+                        Inches(0.5 + row * 2.2),
+                        Inches(4),
+                        Inches(2),
+                    )
+                    box.text_frame.word_wrap = True
+                    box.text_frame.text = LOREM
+                    box.text_frame.paragraphs[0].font.size = Pt(12)
+
+        if i % HIDDEN_EVERY == HIDDEN_EVERY - 1:
+            slide.element.set("show", "0")
+
+    prs.save(str(path))
+
+
+def benchmark_deck(num_slides, cols, repeat, warmup):
+    """Generate one deck and time each thumbnail stage, returning a result dict.
+
+    The pipeline runs warmup + repeat times; only the last repeat runs count,
+    and each metric stores the median across them.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        deck_path = temp_dir / f"bench-{num_slides}.pptx"
+
+        start = time.perf_counter()
+        create_synthetic_deck(deck_path, num_slides)
+        deck = {
+            "slides": num_slides,
+            "deck_bytes": deck_path.stat().st_size,
+            "generate_seconds": round(time.perf_counter() - start, 4),
+            "runs": repeat,
+            "stages": {},
+            "grids": 0,
+            "error": None,
+        }
+
+        profile_dir = temp_dir / "profile"
+        runs = []
+        for run in range(warmup + repeat):
+            work_dir = temp_dir / f"run-{run}"
+            (work_dir / "tmp").mkdir(parents=True)
+            stages, state, error = run_pipeline(
+                deck_path, work_dir, profile_dir, cols
+            )
+            shutil.rmtree(work_dir)
+            if error:
+                deck["error"] = error
+                runs = [stages]
+                break
+            if run >= warmup:
+                runs.append(stages)
+            deck["grids"] = len(state.get("grids", []))
+
+        for name in runs[-1]:
+            samples = [stages[name] for stages in runs if name in stages]
+            deck["stages"][name] = {
+                metric: round(statistics.median(s[metric] for s in samples), 4)
+                for metric in samples[0]
+            }
+        deck["peak_temp_disk_mb"] = max(
+            (m["temp_disk_mb"] for m in deck["stages"].values()), default=0.0
+        )
+        return deck
+
+
+def run_pipeline(deck_path, work_dir, profile_dir, cols):
+    """Run every stage once; return (stage metrics, final state, error or None)."""
+    state = {
+        "deck_path": deck_path,
+        "work_dir": work_dir,
+        "profile_dir": profile_dir,
+        "cols": cols,
+    }
+    stages = {}
+    for name, func in STAGES:
+        # A fresh process per stage, so ru_maxrss for the worker and its
+        # children (soffice, pdftoppm) covers this stage only
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+            try:
+                updates, metrics = executor.submit(run_stage, func, state).result()
+            except Exception as e:
+                return stages, state, f"{name}: {e}"
+        state.update(updates)
+        stages[name] = metrics
+    return stages, state, None
+
+
+def run_stage(func, state):
+    """Run one stage in a fresh worker; return (state updates, metrics)."""
+    # Send Python and child-process temp files into the sampled work dir
+    os.environ["TMPDIR"] = str(state["work_dir"] / "tmp")
+    tempfile.tempdir = None
+
+    sampler = DiskSampler([state["work_dir"], state["profile_dir"]])
+    start = time.perf_counter()
+    # thumbnail.py reports progress on stdout; keep benchmark output clean
+    with sampler, contextlib.redirect_stdout(io.StringIO()):
+        updates = func(state)
+    seconds = time.perf_counter() - start
+    return updates, {
+        "seconds": round(seconds, 4),
+        "peak_rss_mb": round(max_rss_mb(resource.RUSAGE_SELF), 1),
+        "children_peak_rss_mb": round(max_rss_mb(resource.RUSAGE_CHILDREN), 1),
+        "temp_disk_mb": round(sampler.peak / 1e6, 2),
+    }
+
+
+def stage_load(state):
+    """Parse the deck and find hidden slides."""
+    total, hidden = thumbnail.get_hidden_slides(state["deck_path"])
+    return {"total": total, "hidden": hidden}
+
+
+def stage_soffice(state):
+    """Convert the deck to PDF."""
+    pdf_path = thumbnail.convert_to_pdf(
+        state["deck_path"], state["work_dir"], user_installation=state["profile_dir"]
+    )
+    return {"pdf_path": pdf_path}
+
+
+def stage_pdftoppm(state):
+    """Rasterize the PDF to JPEGs."""
+    visible = thumbnail.convert_pdf_to_images(
+        state["pdf_path"], state["work_dir"], thumbnail.CONVERSION_DPI
+    )
+    return {"visible": visible}
+
+
+def stage_placeholders(state):
+    """Write placeholder JPEGs for hidden slides."""
+    images = thumbnail.add_hidden_slide_placeholders(
+        state["visible"], state["total"], state["hidden"], state["work_dir"]
+    )
+    return {"images": images}
+
+
+def stage_grids(state):
+    """Composite and save the thumbnail grids."""
+    grids = thumbnail.create_grids(
+        state["images"],
+        state["cols"],
+        thumbnail.THUMBNAIL_WIDTH,
+        state["work_dir"] / "grid.jpg",
+    )
+    return {"grids": grids}
+
+
+STAGES = [
+    ("load", stage_load),
+    ("soffice", stage_soffice),
+    ("pdftoppm", stage_pdftoppm),
+    ("placeholders", stage_placeholders),
+    ("grids", stage_grids),
+]
+
+
+def max_rss_mb(who):
+    """Return ru_maxrss in MB (Linux reports KB, macOS reports bytes)."""
+    rss = resource.getrusage(who).ru_maxrss
+    if sys.platform == "darwin":
+        return rss / 1e6
+    return rss * 1024 / 1e6
+
+
+def directory_size(path):
+    """Total size in bytes of all files under path."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            # Files can vanish between listing and stat while a stage runs
+            with contextlib.suppress(OSError):
+                total += os.lstat(os.path.join(root, name)).st_size
+    return total
+
+
+class DiskSampler:
+    """Track the peak combined size of some directories from a background thread."""
+
+    def __init__(self, paths):
+        self.paths = paths
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def sample(self):
+        size = sum(directory_size(path) for path in self.paths)
+        self.peak = max(self.peak, size)
+
+    def _run(self):
+        while not self._stop.wait(DISK_SAMPLE_INTERVAL):
+            self.sample()
+
+    def __enter__(self):
+        self.sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+
+def print_deck(num_slides, deck):
+    """Print one deck's stage table."""
+    print(f"  {'stage':<14}{'seconds':>10}{'rss MB':>10}{'child MB':>10}{'disk MB':>10}")
+    for stage, data in deck["stages"].items():
+        print(
+            f"  {stage:<14}{data['seconds']:>10.3f}{data['peak_rss_mb']:>10.1f}"
+            f"{data['children_peak_rss_mb']:>10.1f}{data['temp_disk_mb']:>10.2f}"
+        )
+    if deck["error"]:
+        print(f"  Error: {deck['error']}")
+
+
+def compare_results(baseline, current, thresholds):
+    """Print per-stage deltas and return the list of regressions.
+
+    A regression is any metric growing by more than its threshold, a new
+    error, or a baseline stage that did not complete in the current run.
+    """
+    regressions = []
+    print(f"Comparing against baseline from {baseline.get('created', 'unknown')}")
+
+    for size, deck in current["decks"].items():
+        base_deck = baseline.get("decks", {}).get(size)
+        if not base_deck:
+            print(f"  {size} slides: no baseline")
+            continue
+
+        if deck["error"] and deck["error"] != base_deck.get("error"):
+            print(f"  {size} slides: new error: {deck['error']}  REGRESSION")
+            regressions.append((size, "error", deck["error"]))
+
+        for stage, base in base_deck["stages"].items():
+            data = deck["stages"].get(stage)
+            if data is None:
+                print(
+                    f"  {size} slides / {stage}: missing from current run  REGRESSION"
+                )
+                regressions.append((size, stage, "missing"))
+                continue
+            for metric, unit in METRICS.items():
+                regression = compare_metric(
+                    f"{size} slides / {stage} {metric}",
+                    base.get(metric),
+                    data.get(metric),
+                    unit,
+                    *thresholds[metric],
+                )
+                if regression:
+                    regressions.append((size, stage, metric, regression))
+
+        regression = compare_metric(
+            f"{size} slides / peak_temp_disk_mb",
+            base_deck.get("peak_temp_disk_mb"),
+            deck.get("peak_temp_disk_mb"),
+            "MB",
+            *thresholds["temp_disk_mb"],
+        )
+        if regression:
+            regressions.append((size, "peak_temp_disk_mb", regression))
+
+    return regressions
+
+
+def compare_metric(label, base, value, unit, threshold, min_delta):
+    """Print one metric's delta; return the relative growth if it regressed.
+
+    Growth counts only if it exceeds both the relative threshold and the
+    absolute min_delta, so millisecond stages do not flap on noise.
+    """
+    if base is None or value is None:
+        return None
+    if base:
+        delta = (value - base) / base
+    else:
+        delta = float("inf") if value > 0 else 0.0
+    regressed = delta > threshold and value - base > min_delta
+    flag = "  REGRESSION" if regressed else ""
+    if flag or delta:
+        print(f"  {label}: {base:.3f}{unit} -> {value:.3f}{unit} ({delta:+.1%}){flag}")
+    return delta if flag else None
+
+
+if __name__ == "__main__":
+    main()
@@ -3,67 +3,947 @@
 Rearrange slides in a PowerPoint presentation.
 Usage: python rearrange.py input.pptx output.pptx 0,3,3,5,7
 (Creates output with slides 0, 3, 3 (duplicate), 5, 7 from input)
+
+Batch mode builds many decks from one template, indexing it once:
+    python rearrange.py template.pptx --manifest decks.json [--workers N]
+
+The manifest is JSON or CSV listing output paths and slide indices:
+    [{"output": "client-a.pptx", "indices": [0, 34, 34, 50]}, ...]
+
+    output,indices
+    client-a.pptx,"0,34,34,50"
+
+Outputs are written in parallel worker processes and are byte-for-byte
+identical to separate single runs. Per-output timings are printed.
+
+Add --prune (single or batch mode) to drop parts the kept slides no longer
+reach, such as images, media and unused layouts, and to deduplicate identical
+media blobs. The bytes saved are reported, along with any slide outside the
+show that another part still links to.
+
+Works directly on the OOXML zip package instead of loading the deck into
+python-pptx. Only presentation.xml, its relationships and [Content_Types].xml
+are rewritten; duplicated slides are cloned as new parts together with their
+notes, charts, embeddings and comments, and every other entry, including
+images and video, is copied into the output without being recompressed.
 """
+import argparse
+import copy
+import csv
+import hashlib
+import json
+import os
+import posixpath
+import re
+import struct
 import sys
-from pptx import Presentation
-from copy import deepcopy
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
 from lxml import etree
 
-def duplicate_slide(prs, index):
-    """Duplicate a slide by copying its XML."""
-    source = prs.slides[index]
+CONTENT_TYPES = "[Content_Types].xml"
+ROOT_RELS = "_rels/.rels"
 
-    # Get slide layout
-    slide_layout = source.slide_layout
+NS_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+NS_P = "http://schemas.openxmlformats.org/presentationml/2006/main"
+NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_CT = "http://schemas.openxmlformats.org/package/2006/content-types"
+NS_P14 = "http://schemas.microsoft.com/office/powerpoint/2010/main"
 
-    # Add new slide
-    new_slide = prs.slides.add_slide(slide_layout)
+RT_OFFICE_DOCUMENT = f"{NS_R}/officeDocument"
+RT_SLIDE = f"{NS_R}/slide"
+RT_NOTES_SLIDE = f"{NS_R}/notesSlide"
+RT_SLIDE_LAYOUT = f"{NS_R}/slideLayout"
+RT_SLIDE_MASTER = f"{NS_R}/slideMaster"
 
-    # Copy shapes from source to new slide
-    # We need to work at XML level for proper copying
-    for shape in source.shapes:
-        el = shape._element
-        new_el = deepcopy(el)
-        new_slide.shapes._spTree.insert_element_before(new_el, 'p:extLst')
+# Parts that belong to a single slide and must be cloned with it; images
+# and media are left shared
+NS_R_MS = "http://schemas.microsoft.com/office"
+OWNED_REL_TYPES = {
+    f"{NS_R}/chart",
+    f"{NS_R}/chartUserShapes",
+    f"{NS_R}/comments",
+    f"{NS_R}/diagramColors",
+    f"{NS_R}/diagramData",
+    f"{NS_R}/diagramLayout",
+    f"{NS_R}/diagramQuickStyle",
+    f"{NS_R}/oleObject",
+    f"{NS_R}/package",
+    f"{NS_R}/themeOverride",
+    f"{NS_R}/vmlDrawing",
+    f"{NS_R_MS}/2007/relationships/diagramDrawing",
+    f"{NS_R_MS}/2011/relationships/chartColorStyle",
+    f"{NS_R_MS}/2011/relationships/chartStyle",
+    f"{NS_R_MS}/2018/10/relationships/comments",
+}
 
-    return new_slide
+MEDIA_DIR = "ppt/media/"
 
-def rearrange_slides(input_path, output_path, indices):
-    """Create new presentation with slides in specified order."""
-    prs = Presentation(input_path)
+# p14:sectionLst extension; kept while each section's slides stay contiguous
+SECTION_LIST_URI = "{521415D9-36F7-43E2-AB2F-B90AF26B5E84}"
+
+NSMAP = {
+    "a": NS_A,
+    "p": NS_P,
+    "p14": NS_P14,
+    "r": NS_R,
+    "rel": NS_REL,
+    "ct": NS_CT,
+}
+
+COPY_CHUNK_SIZE = 1024 * 1024
+XML_PARSER = etree.XMLParser(resolve_entities=False)
+
+
+def qn(tag):
+    """Return the Clark-notation name for a prefixed tag, e.g. qn("p:sldId")."""
+    prefix, local = tag.split(":")
+    return f"{{{NSMAP[prefix]}}}{local}"
+
+
+def rels_name(partname):
+    """Return the relationships part name for a part, e.g. ppt/_rels/x.xml.rels."""
+    directory, filename = posixpath.split(partname)
+    return posixpath.join(directory, "_rels", f"{filename}.rels")
+
+
+def resolve_target(source_part, target):
+    """Resolve a relationship target relative to its source part."""
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source_part), target))
+
+
+def relative_target(source_part, target_part):
+    """Return the relationship target from source_part to target_part."""
+    return posixpath.relpath(target_part, posixpath.dirname(source_part))
+
+
+def numbered_template(partname):
+    """Return a part name template, e.g. ppt/charts/chart3.xml -> chart%d.xml."""
+    directory, filename = posixpath.split(partname)
+    stem, ext = posixpath.splitext(filename)
+    return posixpath.join(directory, f"{stem.rstrip('0123456789')}%d{ext}")
+
+
+def serialize(element):
+    """Serialize an XML part the way Office writes it."""
+    return etree.tostring(
+        element, xml_declaration=True, encoding="UTF-8", standalone=True
+    )
+
+
+class SlidePackage:
+    """Index of a .pptx package: slide order, relationships and content types.
+
+    The index is built once and never modified, so a single SlidePackage can
+    write any number of rearranged decks.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with zipfile.ZipFile(self.path) as zf:
+            self.infos = zf.infolist()
+            self.info_by_name = {info.filename: info for info in self.infos}
+
+            # Relationship parts are small; parse them all up front
+            self.rels = {}
+            for info in self.infos:
+                if info.filename.endswith(".rels"):
+                    self.rels[info.filename] = etree.fromstring(
+                        zf.read(info), XML_PARSER
+                    )
+
+            self.content_types = etree.fromstring(zf.read(CONTENT_TYPES), XML_PARSER)
+            self.pres_part = self.targets(
+                "", self.rels[ROOT_RELS], RT_OFFICE_DOCUMENT
+            )[0][1]
+            self.pres_rels_part = rels_name(self.pres_part)
+            self.presentation = etree.fromstring(zf.read(self.pres_part), XML_PARSER)
+
+        pres_targets = {
+            rid: part
+            for rid, part in self.targets(
+                self.pres_part, self.rels[self.pres_rels_part], RT_SLIDE
+            )
+        }
+        self.slides = [
+            pres_targets[sld_id.get(qn("r:id"))]
+            for sld_id in self.presentation.iterfind("p:sldIdLst/p:sldId", NSMAP)
+        ]
+        # Hashed on the first pruned write, then shared by every later output
+        self._media_digests = None
+
+    @staticmethod
+    def targets(source_part, rels, rel_type=None):
+        """Return (rId, part) for internal relationships, optionally by type."""
+        return [
+            (rel.get("Id"), resolve_target(source_part, rel.get("Target")))
+            for rel in rels
+            if rel.get("TargetMode") != "External"
+            and (rel_type is None or rel.get("Type") == rel_type)
+        ]
+
+    def part_rels(self, partname):
+        """Return the parsed relationships of a part, or None if it has none."""
+        return self.rels.get(rels_name(partname))
+
+    def notes_slide(self, slide_part):
+        """Return the notes slide part belonging to a slide, if any."""
+        rels = self.part_rels(slide_part)
+        if rels is None:
+            return None
+        notes = self.targets(slide_part, rels, RT_NOTES_SLIDE)
+        return notes[0][1] if notes else None
+
+    @staticmethod
+    def next_part_name(template, taken):
+        """Return the next free part name for a template like ppt/slides/slide%d.xml."""
+        pattern = re.compile(re.escape(template).replace("%d", r"(\d+)") + "$")
+        numbers = [int(m.group(1)) for name in taken if (m := pattern.match(name))]
+        partname = template % (max(numbers, default=0) + 1)
+        taken.add(partname)
+        return partname
+
+    def clone_owned_parts(self, owner, rels, taken, clones, cloned):
+        """Clone parts owned by a cloned part (charts, embeddings, comments...).
+
+        rels are the new owner's relationships; their targets are repointed at
+        the clones. cloned maps source parts already cloned for this owner.
+        """
+        for rel in rels:
+            if rel.get("Type") not in OWNED_REL_TYPES:
+                continue
+            if rel.get("TargetMode") == "External":
+                continue
+            # Clones live beside their source, so targets resolve the same way
+            source = resolve_target(owner, rel.get("Target"))
+            if source not in self.info_by_name:
+                continue
+            if source not in cloned:
+                new_part = self.next_part_name(numbered_template(source), taken)
+                cloned[source] = new_part
+                new_rels = copy.deepcopy(self.part_rels(source))
+                if new_rels is not None:
+                    self.clone_owned_parts(new_part, new_rels, taken, clones, cloned)
+                clones.append((new_part, source, new_rels))
+            rel.set("Target", relative_target(owner, cloned[source]))
+
+    def check_indices(self, indices):
+        """Raise IndexError if any slide index is outside the deck."""
+        for idx in indices:
+            if not 0 <= idx < len(self.slides):
+                raise IndexError(
+                    f"Slide index {idx} out of range "
+                    f"(deck has {len(self.slides)} slides)"
+                )
+
+    def rearrange(self, output_path, indices, prune=False):
+        """Write a deck containing slides in the given order.
+
+        With prune=True, parts no longer reachable from the kept slides and
+        duplicate media are dropped as well. Returns (slide_count, bytes_saved,
+        retained_slides): bytes_saved is the compressed size of everything
+        pruned, and retained_slides lists slide parts kept in the package
+        although they are not in the show (empty without prune).
+        """
+        self.check_indices(indices)
+
+        presentation = copy.deepcopy(self.presentation)
+        pres_rels = copy.deepcopy(self.rels[self.pres_rels_part])
+        content_types = copy.deepcopy(self.content_types)
+
+        sld_id_lst = presentation.find(qn("p:sldIdLst"))
+        original_sld_ids = list(sld_id_lst)
+        slide_rids = {
+            part: rid
+            for rid, part in self.targets(self.pres_part, pres_rels, RT_SLIDE)
+        }
+
+        taken = set(self.info_by_name)
+        next_sld_id = max(int(el.get("id")) for el in original_sld_ids) + 1
+        rid_numbers = [
+            int(m.group(1))
+            for rel in pres_rels
+            if (m := re.match(r"rId(\d+)$", rel.get("Id")))
+        ]
+        next_rid = max(rid_numbers, default=0) + 1
+
+        kept = set()
+        new_sld_ids = []
+        sources = []  # Template sldId id behind each entry of new_sld_ids
+        clones = []  # (new_part, source_part, new_rels or None)
+        for idx in indices:
+            source = self.slides[idx]
+            sources.append(original_sld_ids[idx].get("id"))
+            if source not in kept:
+                kept.add(source)
+                new_sld_ids.append(original_sld_ids[idx])
+                continue
+
+            # Duplicate: clone the slide part and give it its own notes slide
+            slide_part = self.next_part_name(
+                posixpath.join(posixpath.dirname(source), "slide%d.xml"), taken
+            )
+            slide_rels = copy.deepcopy(self.part_rels(source))
+            if slide_rels is not None:
+                self.clone_owned_parts(slide_part, slide_rels, taken, clones, {})
+            notes_source = self.notes_slide(source)
+            if notes_source:
+                notes_part = self.next_part_name(
+                    posixpath.join(posixpath.dirname(notes_source), "notesSlide%d.xml"),
+                    taken,
+                )
+                notes_rels = copy.deepcopy(self.part_rels(notes_source))
+                for rel in notes_rels:
+                    if rel.get("Type") == RT_SLIDE:
+                        rel.set("Target", relative_target(notes_part, slide_part))
+                for rel in slide_rels:
+                    if rel.get("Type") == RT_NOTES_SLIDE:
+                        rel.set("Target", relative_target(slide_part, notes_part))
+                clones.append((notes_part, notes_source, notes_rels))
+            clones.append((slide_part, source, slide_rels))
+
+            rid = f"rId{next_rid}"
+            next_rid += 1
+            etree.SubElement(
+                pres_rels,
+                qn("rel:Relationship"),
+                Id=rid,
+                Type=RT_SLIDE,
+                Target=relative_target(self.pres_part, slide_part),
+            )
+            sld_id = etree.Element(qn("p:sldId"), id=str(next_sld_id))
+            sld_id.set(qn("r:id"), rid)
+            next_sld_id += 1
+            new_sld_ids.append(sld_id)
+
+        for el in original_sld_ids:
+            sld_id_lst.remove(el)
+        sld_id_lst.extend(new_sld_ids)
+        update_sections(presentation, new_sld_ids, sources)
+
+        dropped = self.dropped_parts(kept)
+        dropped_rids = {slide_rids[part] for part in dropped if part in slide_rids}
+        for rel in list(pres_rels):
+            if rel.get("Id") in dropped_rids:
+                pres_rels.remove(rel)
+        remove_stale_references(presentation, dropped_rids)
+
+        # Relationships of every part in the output; originals are copied on write
+        rels_map = {
+            name: rels
+            for name, rels in self.rels.items()
+            if self.rels_owner(name) not in dropped
+        }
+        rels_map[self.pres_rels_part] = pres_rels
+        for new_part, _, new_rels in clones:
+            if new_rels is not None:
+                rels_map[rels_name(new_part)] = new_rels
+        changed = set()
+        rewritten = {}
+        clone_sources = {new_part: source for new_part, source, _ in clones}
+        self.unlink_dropped(rels_map, changed, rewritten, dropped, clone_sources)
+
+        bytes_saved = 0
+        retained = []
+        if prune:
+            pruned, retained = self.prune(rels_map, changed, rewritten)
+            pruned -= dropped
+            bytes_saved = sum(
+                self.info_by_name[name].compress_size
+                for part in pruned
+                for name in (part, rels_name(part))
+                if name in self.info_by_name
+            )
+            dropped |= pruned
+
+        for name in changed:
+            rewritten[name] = serialize(rels_map[name])
+        overrides = {
+            el.get("PartName"): el for el in content_types.iter(qn("ct:Override"))
+        }
+        for part in dropped:
+            override = overrides.get(f"/{part}")
+            if override is not None:
+                content_types.remove(override)
+        for new_part, source_part, _ in clones:
+            override = overrides.get(f"/{source_part}")
+            if override is not None:
+                clone = copy.deepcopy(override)
+                clone.set("PartName", f"/{new_part}")
+                content_types.append(clone)
+
+        rewritten[CONTENT_TYPES] = serialize(content_types)
+        rewritten[self.pres_part] = serialize(presentation)
+        rewritten[self.pres_rels_part] = serialize(pres_rels)
+        skipped = dropped | {rels_name(part) for part in dropped}
+        self.write_package(output_path, rewritten, skipped, clones)
+        return len(new_sld_ids), bytes_saved, retained
+
+    def dropped_parts(self, kept_slides):
+        """Return the removed slides and their notes slides."""
+        dropped = set()
+        for slide in self.slides:
+            if slide not in kept_slides:
+                dropped.add(slide)
+                notes = self.notes_slide(slide)
+                if notes:
+                    dropped.add(notes)
+        return dropped
+
+    def writable_rels(self, rels_map, changed, name):
+        """Return rels_map[name], copying it first if it is shared with the index."""
+        if rels_map[name] is self.rels.get(name):
+            rels_map[name] = copy.deepcopy(rels_map[name])
+            changed.add(name)
+        return rels_map[name]
+
+    def unlink_dropped(self, rels_map, changed, rewritten, dropped, clone_sources):
+        """Remove links from remaining parts to dropped parts.
+
+        Like deleting a slide in PowerPoint, a hyperlink from a kept slide to a
+        removed one is removed rather than keeping the target slide alive.
+        Rewritten parts (including clones, keyed by their new name) go into
+        rewritten.
+        """
+        with zipfile.ZipFile(self.path) as zf:
+            for name in list(rels_map):
+                owner = self.rels_owner(name)
+                stale = {
+                    rid
+                    for rid, target in self.targets(owner, rels_map[name])
+                    if target in dropped
+                }
+                if not stale:
+                    continue
+                rels = self.writable_rels(rels_map, changed, name)
+                for rel in list(rels):
+                    if rel.get("Id") in stale:
+                        rels.remove(rel)
+                part_xml = etree.fromstring(
+                    zf.read(clone_sources.get(owner, owner)), XML_PARSER
+                )
+                remove_relationship_references(part_xml, stale)
+                rewritten[owner] = serialize(part_xml)
+
+    def prune(self, rels_map, changed, rewritten):
+        """Find parts to drop: unreachable parts, unused layouts, duplicate media.
+
+        Walks rels_map (the output package's relationships) from the package
+        root, so from the presentation through the slides in the show. Links
+        from a slide master to its layouts do not count, so only layouts used
+        by a remaining slide survive; every master keeps at least one. Masters
+        that change are added to rewritten and relationship parts that change
+        to changed.
+
+        Returns (parts_to_drop, retained_slides), where retained_slides are
+        slides outside the show kept alive by a link from another part.
+        """
+        reachable = {""}
+        masters = set()
+        linked_slides = set()
+        layout_links = {}  # master -> [(rId, layout)]
+
+        def walk(part):
+            stack = [part]
+            while stack:
+                part = stack.pop()
+                rels = rels_map.get(rels_name(part))
+                if rels is None:
+                    continue
+                for rel in rels:
+                    if rel.get("TargetMode") == "External":
+                        continue
+                    target = resolve_target(part, rel.get("Target"))
+                    if rel.get("Type") == RT_SLIDE_MASTER:
+                        masters.add(target)
+                    elif rel.get("Type") == RT_SLIDE and part != self.pres_part:
+                        linked_slides.add(target)
+                    elif part in masters and rel.get("Type") == RT_SLIDE_LAYOUT:
+                        links = layout_links.setdefault(part, [])
+                        links.append((rel.get("Id"), target))
+                        continue
+                    if target not in reachable:
+                        reachable.add(target)
+                        stack.append(target)
+
+        walk("")
+        for links in layout_links.values():
+            if not any(layout in reachable for _, layout in links):
+                reachable.add(links[0][1])
+                walk(links[0][1])
 
-    # Create new presentation with same slide dimensions
-    new_prs = Presentation()
-    new_prs.slide_width = prs.slide_width
-    new_prs.slide_height = prs.slide_height
+        with zipfile.ZipFile(self.path) as zf:
+            for master, links in layout_links.items():
+                unused = {rid for rid, layout in links if layout not in reachable}
+                if not unused:
+                    continue
+                master_rels = self.writable_rels(rels_map, changed, rels_name(master))
+                for rel in list(master_rels):
+                    if rel.get("Id") in unused:
+                        master_rels.remove(rel)
+                master_xml = etree.fromstring(zf.read(master), XML_PARSER)
+                for el in master_xml.iterfind("p:sldLayoutIdLst/p:sldLayoutId", NSMAP):
+                    if el.get(qn("r:id")) in unused:
+                        el.getparent().remove(el)
+                rewritten[master] = serialize(master_xml)
 
-    # Copy slide masters and layouts from source
-    # This is complex - simpler to work with original and delete unwanted slides
+            duplicates = self.duplicate_media(reachable)
 
-    # Alternative: work with original, mark slides to keep, delete others
-    total_slides = len(prs.slides)
-    slides_to_delete = [i for i in range(total_slides) if i not in indices]
+        # Point every link at a duplicate to the copy that is kept
+        for name, rels in list(rels_map.items()):
+            owner = self.rels_owner(name)
+            if owner not in reachable:
+                continue
+            if not any(target in duplicates for _, target in self.targets(owner, rels)):
+                continue
+            for rel in self.writable_rels(rels_map, changed, name):
+                if rel.get("TargetMode") == "External":
+                    continue
+                target = resolve_target(owner, rel.get("Target"))
+                if target in duplicates:
+                    rel.set("Target", relative_target(owner, duplicates[target]))
 
-    # Delete from end to preserve indices
-    for idx in sorted(slides_to_delete, reverse=True):
-        rId = prs.slides._sldIdLst[idx].rId
-        prs.part.drop_rel(rId)
-        del prs.slides._sldIdLst[idx]
+        parts = {
+            name
+            for name in self.info_by_name
+            if not name.endswith((".rels", "/")) and name != CONTENT_TYPES
+        }
+        show = {
+            target
+            for _, target in self.targets(
+                self.pres_part, rels_map[self.pres_rels_part], RT_SLIDE
+            )
+        }
+        return (parts - reachable) | set(duplicates), sorted(linked_slides - show)
 
-    # Reorder remaining slides according to indices
-    # (This is simplified - assumes no duplicates for now)
+    def media_digests(self):
+        """Return {part: sha256} for media parts that might have a duplicate.
 
-    prs.save(output_path)
-    print(f"Created {output_path} with {len(prs.slides)} slides")
+        Only parts sharing size and CRC with another media part are hashed. The
+        result is computed once and reused for every output of this package.
+        """
+        if self._media_digests is not None:
+            return self._media_digests
+
+        candidates = {}
+        for info in self.infos:
+            if info.filename.startswith(MEDIA_DIR):
+                candidates.setdefault((info.file_size, info.CRC), []).append(
+                    info.filename
+                )
+
+        digests = {}
+        with zipfile.ZipFile(self.path) as zf:
+            for group in candidates.values():
+                if len(group) < 2:
+                    continue
+                # Same size and CRC is only a hint; confirm with a real hash
+                for part in group:
+                    digest = hashlib.sha256()
+                    with zf.open(part) as f:
+                        for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b""):
+                            digest.update(chunk)
+                    digests[part] = digest.digest()
+        self._media_digests = digests
+        return digests
+
+    def duplicate_media(self, parts):
+        """Map duplicate media parts to the first part with identical content."""
+        digests = self.media_digests()
+        first_by_digest = {}
+        duplicates = {}
+        for part in sorted(parts):
+            digest = digests.get(part)
+            if digest is None:
+                continue
+            first = first_by_digest.setdefault(digest, part)
+            if first != part:
+                duplicates[part] = first
+        return duplicates
+
+    @staticmethod
+    def rels_owner(rels_part):
+        """Return the part a relationships part belongs to ('' for the package)."""
+        directory, filename = posixpath.split(rels_part)
+        return posixpath.join(posixpath.dirname(directory), filename[: -len(".rels")])
+
+    def write_package(self, output_path, rewritten, skipped, clones):
+        """Write the output zip, raw-copying every entry that is not rewritten."""
+        output_path = Path(output_path)
+        # Write beside the destination first so output_path may equal the input
+        fd, temp_path = tempfile.mkstemp(
+            suffix=".pptx", dir=output_path.parent.resolve()
+        )
+        os.close(fd)
+        try:
+            # mkstemp creates 0600; match the file being replaced, else the umask
+            os.chmod(temp_path, output_mode(output_path))
+            with open(self.path, "rb") as src, zipfile.ZipFile(
+                temp_path, "w", zipfile.ZIP_DEFLATED
+            ) as zout:
+                for info in self.infos:
+                    if info.filename in skipped:
+                        continue
+                    if info.filename in rewritten:
+                        write_entry(zout, info, info.filename, rewritten[info.filename])
+                    else:
+                        copy_raw_entry(src, zout, info)
+
+                for new_part, source_part, new_rels in clones:
+                    source_info = self.info_by_name[source_part]
+                    if new_part in rewritten:
+                        write_entry(zout, source_info, new_part, rewritten[new_part])
+                    else:
+                        copy_raw_entry(src, zout, source_info, new_part)
+                    if new_rels is not None:
+                        source_rels = self.info_by_name[rels_name(source_part)]
+                        write_entry(
+                            zout, source_rels, rels_name(new_part), serialize(new_rels)
+                        )
+            os.replace(temp_path, output_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def output_mode(path):
+    """Return the permission bits a newly written output file should have."""
+    try:
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def remove_stale_references(presentation, dropped_rids):
+    """Remove custom-show entries for dropped slides."""
+    for sld in presentation.iterfind(".//p:custShow/p:sldLst/p:sld", NSMAP):
+        if sld.get(qn("r:id")) in dropped_rids:
+            sld.getparent().remove(sld)
+
+
+def update_sections(presentation, new_sld_ids, sources):
+    """Rewrite the section list for the new slide order.
+
+    Each slide lands in the section of the template slide it came from, so
+    deletions and duplicates keep their sections, and whole sections may move.
+    The list is removed only if some section's slides are no longer contiguous.
+    """
+    ext = next(
+        (
+            ext
+            for ext in presentation.iterfind("p:extLst/p:ext", NSMAP)
+            if ext.get("uri") == SECTION_LIST_URI
+        ),
+        None,
+    )
+    if ext is None:
+        return
+    section_lst = ext.find("p14:sectionLst", NSMAP)
+    sections = [] if section_lst is None else list(section_lst)
+
+    section_of = {}
+    for number, section in enumerate(sections):
+        for el in section.iterfind("p14:sldIdLst/p14:sldId", NSMAP):
+            section_of[el.get("id")] = number
+
+    # Walk the new order, collecting runs of slides from the same section
+    order = []
+    members = {}
+    for sld_id, source in zip(new_sld_ids, sources):
+        number = section_of.get(source)
+        if number is None or (number in members and order[-1] != number):
+            ext.getparent().remove(ext)
+            return
+        if number not in members:
+            order.append(number)
+            members[number] = []
+        members[number].append(sld_id.get("id"))
+
+    for number, section in enumerate(sections):
+        sld_id_lst = section.find("p14:sldIdLst", NSMAP)
+        if sld_id_lst is None:
+            sld_id_lst = etree.SubElement(section, qn("p14:sldIdLst"))
+        for el in list(sld_id_lst):
+            sld_id_lst.remove(el)
+        for sld_id in members.get(number, []):
+            etree.SubElement(sld_id_lst, qn("p14:sldId"), id=sld_id)
+
+    # Sections left empty stay behind the section that preceded them
+    groups = {None: []}
+    anchor = None
+    for number, section in enumerate(sections):
+        if number in members:
+            anchor = number
+            groups[number] = [section]
+        else:
+            groups[anchor].append(section)
+    for number in [None] + order:
+        for section in groups[number]:
+            section_lst.append(section)
+
+
+def remove_relationship_references(element, rids):
+    """Remove hyperlinks and r: attributes that refer to the given rIds."""
+    hyperlinks = (qn("a:hlinkClick"), qn("a:hlinkHover"))
+    for el in list(element.iter()):
+        for attr, value in list(el.attrib.items()):
+            if not (attr.startswith(f"{{{NS_R}}}") and value in rids):
+                continue
+            if el.tag in hyperlinks:
+                el.getparent().remove(el)
+                break
+            del el.attrib[attr]
+
+
+def write_entry(zout, source_info, name, data):
+    """Compress and write a rewritten part, keeping the source entry's metadata."""
+    info = zipfile.ZipInfo(name, date_time=source_info.date_time)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.create_system = source_info.create_system
+    info.external_attr = source_info.external_attr
+    zout.writestr(info, data)
+
+
+def copy_raw_entry(src, zout, source_info, name=None):
+    """Copy a zip entry's compressed bytes into zout without recompressing.
+
+    zipfile has no public API for this, so the local header is written with
+    ZipInfo.FileHeader and the writer's bookkeeping is updated by hand.
+    """
+    # Locate the compressed data after the source entry's local header
+    src.seek(source_info.header_offset)
+    header = src.read(zipfile.sizeFileHeader)
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    src.seek(source_info.header_offset + zipfile.sizeFileHeader + name_len + extra_len)
+
+    info = zipfile.ZipInfo(
+        name or source_info.filename, date_time=source_info.date_time
+    )
+    info.compress_type = source_info.compress_type
+    info.create_system = source_info.create_system
+    info.external_attr = source_info.external_attr
+    info.CRC = source_info.CRC
+    info.compress_size = source_info.compress_size
+    info.file_size = source_info.file_size
+    # Sizes go in the local header, so no trailing data descriptor is needed
+    info.flag_bits = source_info.flag_bits & ~0x08
+
+    info.header_offset = zout.fp.tell()
+    zout.fp.write(info.FileHeader())
+    remaining = info.compress_size
+    while remaining:
+        chunk = src.read(min(COPY_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated entry: {source_info.filename}")
+        zout.fp.write(chunk)
+        remaining -= len(chunk)
+
+    zout.filelist.append(info)
+    zout.NameToInfo[info.filename] = info
+    zout.start_dir = zout.fp.tell()
+    zout._didModify = True
+
+
+def rearrange_slides(input_path, output_path, indices, prune=False):
+    """Create new presentation with slides in specified order."""
+    package = SlidePackage(input_path)
+    count, bytes_saved, retained = package.rearrange(output_path, indices, prune)
+    print(f"Created {output_path} with {count} slides")
+    if prune:
+        print(f"Pruned {bytes_saved / 1e6:.1f} MB of unused parts and duplicate media")
+    if retained:
+        print(f"Retained slides not in the show: {', '.join(retained)}")
     return output_path
 
-if __name__ == "__main__":
-    if len(sys.argv) < 4:
-        print("Usage: python rearrange.py input.pptx output.pptx 0,3,5,7")
+
+def parse_indices(value):
+    """Parse slide indices from a list or a comma-separated string."""
+    if isinstance(value, str):
+        return [int(x) for x in value.split(",")]
+    return [int(x) for x in value]
+
+
+def load_manifest(manifest_path):
+    """Load (output_path, indices) pairs from a JSON or CSV manifest."""
+    manifest_path = Path(manifest_path)
+    # utf-8-sig strips the BOM Excel writes, which would corrupt the first header
+    with open(manifest_path, newline="", encoding="utf-8-sig") as f:
+        if manifest_path.suffix.lower() == ".csv":
+            rows = list(csv.DictReader(f))
+        else:
+            rows = json.load(f)
+    if not isinstance(rows, list):
+        raise ValueError(f"{manifest_path}: manifest must be a list of entries")
+
+    entries = []
+    for number, row in enumerate(rows, 1):
+        if not isinstance(row, dict):
+            raise ValueError(f"Manifest entry {number}: expected an object")
+        for field in ("output", "indices"):
+            if row.get(field) in (None, ""):
+                raise ValueError(f"Manifest entry {number}: missing '{field}'")
+        try:
+            indices = parse_indices(row["indices"])
+        except (TypeError, ValueError):
+            raise ValueError(
+                f"Manifest entry {number}: invalid indices {row['indices']!r}"
+            )
+        entries.append((row["output"], indices))
+
+    # Compare resolved paths so a.pptx and ./a.pptx count as the same file
+    seen = {}
+    for output, _ in entries:
+        resolved = Path(output).resolve()
+        if resolved in seen:
+            raise ValueError(
+                f"Duplicate outputs in manifest: {seen[resolved]}, {output}"
+            )
+        seen[resolved] = output
+    return entries
+
+
+# Template index for batch workers; with fork it is inherited from the parent
+_batch_package = None
+
+
+def _init_batch_worker(input_path, prune):
+    """Index the template once per worker unless it was inherited."""
+    global _batch_package
+    if _batch_package is None or _batch_package.path != Path(input_path):
+        _batch_package = SlidePackage(input_path)
+        if prune:
+            _batch_package.media_digests()
+
+
+def _write_batch_output(output_path, indices, prune):
+    """Write one manifest entry, returning its rearrange_batch result tuple."""
+    start = time.perf_counter()
+    count, bytes_saved, retained = _batch_package.rearrange(
+        output_path, indices, prune
+    )
+    return output_path, count, bytes_saved, retained, time.perf_counter() - start
+
+
+def rearrange_batch(input_path, manifest_path, workers=None, prune=False):
+    """Write every deck in a manifest from one indexed template.
+
+    Returns a list of (output_path, slide_count, bytes_saved, retained_slides,
+    seconds) in manifest order.
+    """
+    global _batch_package
+    entries = load_manifest(manifest_path)
+
+    # Every output reads the template at offsets indexed up front, so no
+    # entry may replace it (single mode allows output == input on purpose)
+    template = Path(input_path).resolve()
+    for output_path, _ in entries:
+        if Path(output_path).resolve() == template:
+            raise ValueError(
+                f"{output_path}: manifest output would overwrite the template"
+            )
+
+    start = time.perf_counter()
+    _batch_package = SlidePackage(input_path)
+    print(
+        f"Indexed {input_path} ({len(_batch_package.slides)} slides) "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+
+    # Validate every entry before writing anything
+    for output_path, indices in entries:
+        try:
+            _batch_package.check_indices(indices)
+        except IndexError as e:
+            raise IndexError(f"{output_path}: {e}") from None
+
+    if prune:
+        # Hash the template's media once here; forked workers inherit it
+        _batch_package.media_digests()
+
+    workers = min(workers or os.cpu_count() or 1, len(entries))
+    results = {}
+    if workers <= 1:
+        for output_path, indices in entries:
+            results[output_path] = _write_batch_output(output_path, indices, prune)
+            print_batch_result(*results[output_path])
+    else:
+        with ProcessPoolExecutor(
+            workers, initializer=_init_batch_worker, initargs=(str(input_path), prune)
+        ) as executor:
+            futures = [
+                executor.submit(_write_batch_output, output_path, indices, prune)
+                for output_path, indices in entries
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result[0]] = result
+                print_batch_result(*result)
+
+    print(
+        f"Created {len(entries)} deck(s) in {time.perf_counter() - start:.2f}s "
+        f"using {workers} worker(s)"
+    )
+    return [results[output_path] for output_path, _ in entries]
+
+
+def print_batch_result(output_path, count, bytes_saved, retained, seconds):
+    """Print one batch output's timing."""
+    pruned = f", pruned {bytes_saved / 1e6:.1f} MB" if bytes_saved else ""
+    print(f"  {output_path}: {count} slides in {seconds:.2f}s{pruned}")
+    if retained:
+        print(f"    retained slides not in the show: {', '.join(retained)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rearrange, duplicate and delete slides in a PowerPoint deck."
+    )
+    parser.add_argument("input", help="Input PowerPoint file (.pptx)")
+    parser.add_argument("output", nargs="?", help="Output PowerPoint file (.pptx)")
+    parser.add_argument(
+        "indices", nargs="?", help="Comma-separated 0-based slide indices, e.g. 0,3,3,5"
+    )
+    parser.add_argument(
+        "--manifest", help="JSON or CSV manifest of outputs and indices (batch mode)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Worker processes for batch mode (default: CPU count)",
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="Drop unreachable parts and unused layouts, deduplicate media",
+    )
+    args = parser.parse_args()
+
+    if args.manifest:
+        if args.output or args.indices:
+            parser.error("output and indices cannot be combined with --manifest")
+    elif not (args.output and args.indices):
+        parser.error("output and indices are required without --manifest")
+
+    try:
+        if args.manifest:
+            rearrange_batch(args.input, args.manifest, args.workers, args.prune)
+        else:
+            rearrange_slides(
+                args.input, args.output, parse_indices(args.indices), args.prune
+            )
+    except Exception as e:
+        print(f"Error: {e}")
         sys.exit(1)
 
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
-    indices = [int(x) for x in sys.argv[3].split(',')]
 
-    rearrange_slides(input_path, output_path, indices)
+if __name__ == "__main__":
+    main()
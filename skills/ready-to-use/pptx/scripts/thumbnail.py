@@ -196,7 +196,16 @@ def get_placeholder_regions(pptx_path):
 
 def convert_to_images(pptx_path, temp_dir, dpi):
     """Convert PowerPoint to images via PDF, handling hidden slides."""
-    # Detect hidden slides
+    total_slides, hidden_slides = get_hidden_slides(pptx_path)
+    pdf_path = convert_to_pdf(pptx_path, temp_dir)
+    visible_images = convert_pdf_to_images(pdf_path, temp_dir, dpi)
+    return add_hidden_slide_placeholders(
+        visible_images, total_slides, hidden_slides, temp_dir
+    )
+
+
+def get_hidden_slides(pptx_path):
+    """Return (total_slides, hidden_slides) with 1-based hidden slide numbers."""
     print("Analyzing presentation...")
     prs = Presentation(str(pptx_path))
     total_slides = len(prs.slides)
@@ -212,27 +221,37 @@ def convert_to_images(pptx_path, temp_dir, dpi):
     if hidden_slides:
         print(f"Hidden slides: {sorted(hidden_slides)}")
 
+    return total_slides, hidden_slides
+
+
+def convert_to_pdf(pptx_path, temp_dir, user_installation=None):
+    """Convert PowerPoint to PDF with LibreOffice, returning the PDF path.
+
+    user_installation optionally points LibreOffice at its own profile directory
+    instead of the user's default one.
+    """
     pdf_path = temp_dir / f"{pptx_path.stem}.pdf"
 
-    # Convert to PDF
+    cmd = ["soffice", "--headless"]
+    if user_installation:
+        profile_uri = Path(user_installation).resolve().as_uri()
+        cmd.append(f"-env:UserInstallation={profile_uri}")
+    cmd += ["--convert-to", "pdf", "--outdir", str(temp_dir), str(pptx_path)]
+
     print("Converting to PDF...")
     result = subprocess.run(
-        [
-            "soffice",
-            "--headless",
-            "--convert-to",
-            "pdf",
-            "--outdir",
-            str(temp_dir),
-            str(pptx_path),
-        ],
+        cmd,
         capture_output=True,
         text=True,
     )
     if result.returncode != 0 or not pdf_path.exists():
         raise RuntimeError("PDF conversion failed")
 
-    # Convert PDF to images
+    return pdf_path
+
+
+def convert_pdf_to_images(pdf_path, temp_dir, dpi):
+    """Rasterize PDF pages to JPEG images, returning them in page order."""
     print(f"Converting to images at {dpi} DPI...")
     result = subprocess.run(
         ["pdftoppm", "-jpeg", "-r", str(dpi), str(pdf_path), str(temp_dir / "slide")],
@@ -242,8 +261,13 @@ def convert_to_images(pptx_path, temp_dir, dpi):
     if result.returncode != 0:
         raise RuntimeError("Image conversion failed")
 
-    visible_images = sorted(temp_dir.glob("slide-*.jpg"))
+    return sorted(temp_dir.glob("slide-*.jpg"))
+
 
+def add_hidden_slide_placeholders(
+    visible_images, total_slides, hidden_slides, temp_dir
+):
+    """Interleave placeholder images for hidden slides, which soffice skips."""
     # Create full list with placeholders for hidden slides
     all_images = []
     visible_idx = 0